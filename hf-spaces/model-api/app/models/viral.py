@@ -88,10 +88,15 @@ class ViralTrendPredictor(BaseModelWrapper):
         ]
 
         try:
+            # Scaled models are saved as a Pipeline ending in the classifier
+            estimator = self.model
+            if hasattr(estimator, "steps"):
+                estimator = estimator.steps[-1][1]
+
             # Logistic Regression uses coefficients
-            if hasattr(self.model, "coef_"):
+            if hasattr(estimator, "coef_"):
                 # coef_ is shape (1, n_features) for binary classification
-                importances = np.abs(self.model.coef_[0])
+                importances = np.abs(estimator.coef_[0])
                 return dict(zip(feature_names, [float(i) for i in importances]))
         except Exception:
             pass
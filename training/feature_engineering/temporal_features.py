@@ -9,8 +9,27 @@ def add_date_features(df: pd.DataFrame, date_col="published_at") -> pd.DataFrame
 
     df[date_col] = pd.to_datetime(df[date_col])
 
-    df["publish_hour"] = df[date_col].dt.hour
-    df["publish_day"] = df[date_col].dt.dayofweek
+    # Hour/weekday straight from the epoch nanoseconds of the wall-clock time
+    dates = df[date_col]
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    values = dates.values
+    ns = values.view("i8")
+    hours = (ns // 3_600_000_000_000) % 24
+    # 1970-01-01 was a Thursday (dayofweek 3)
+    days = (ns // 86_400_000_000_000 + 3) % 7
+
+    missing = np.isnat(values)
+    if missing.any():
+        # Keep NaN for missing dates, as the .dt accessors do
+        hours = np.where(missing, np.nan, hours)
+        days = np.where(missing, np.nan, days)
+    else:
+        hours = hours.astype(np.int8)
+        days = days.astype(np.int8)
+
+    df["publish_hour"] = hours
+    df["publish_day"] = days
     df["is_weekend"] = df["publish_day"].isin([5, 6]).astype(int)
 
     # Cyclical Time Features
@@ -46,10 +65,24 @@ def calculate_velocity_features(df: pd.DataFrame, window=5) -> pd.DataFrame:
     df = df.sort_values(["channel_id", "published_at"])
 
     # Lagged features: Avg views of PREVIOUS n videos
-    df["channel_avg_views_recent"] = (
-        df.groupby("channel_id")["views"]
-        .transform(lambda x: x.rolling(window=window, min_periods=1).mean().shift(1))
-        .fillna(0)
-    )
+    # Prefix sums over the sorted frame give every channel's window at once
+    codes, _ = pd.factorize(df["channel_id"])
+    views = df["views"].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(views)
+    view_sums = np.r_[0.0, np.cumsum(np.where(valid, views, 0.0))]
+    view_counts = np.r_[0, np.cumsum(valid)]
+
+    # Each row's window is clipped to the start of its channel's segment
+    pos = np.arange(len(df))
+    seg_starts = np.r_[0, np.flatnonzero(codes[1:] != codes[:-1]) + 1]
+    row_starts = np.repeat(seg_starts, np.diff(np.r_[seg_starts, len(df)]))
+    lo = np.maximum(row_starts, pos - window)
+
+    count = view_counts[pos] - view_counts[lo]
+    total = view_sums[pos] - view_sums[lo]
+    avg = np.divide(total, count, out=np.zeros(len(df)), where=count > 0)
+    # Rows without a channel have no history
+    avg[codes < 0] = 0
+    df["channel_avg_views_recent"] = avg
 
     return df
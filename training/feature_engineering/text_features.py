@@ -52,7 +52,7 @@ def extract_title_features(df: pd.DataFrame, title_col="title") -> pd.DataFrame:
     df["title_len"] = titles.str.len()
 
     # Count uppercase characters
-    df["caps_count"] = titles.apply(lambda x: sum(1 for c in x if c.isupper()))
+    df["caps_count"] = titles.map(lambda x: sum(map(str.isupper, x)))
     df["caps_ratio"] = df["caps_count"] / (df["title_len"] + 1)
 
     # Punctuation counts
@@ -4,6 +4,25 @@ import pandas as pd
 from training.feature_engineering import temporal_features, text_features
 
 
+def _snapshot_bounds(video_ids: pd.Series, stat_times: np.ndarray):
+    """
+    Orders rows by (video, stat_time) and finds each video's first/last row.
+
+    Returns:
+        (order, first_idx, last_idx): `order` sorts the rows; `first_idx` and
+        `last_idx` are positions in the sorted order, one per video (sorted).
+    """
+    # Categorical ids factorize straight from their integer codes
+    codes, _ = pd.factorize(video_ids, sort=True)
+    order = np.lexsort((stat_times, codes))
+    sorted_codes = codes[order]
+
+    # A new video starts wherever the code changes
+    first_idx = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    last_idx = np.r_[first_idx[1:] - 1, len(sorted_codes) - 1]
+    return order, first_idx, last_idx
+
+
 def prepare_viral_features(
     df: pd.DataFrame, viral_threshold_quantile=0.80
 ) -> pd.DataFrame:
@@ -17,116 +36,98 @@ def prepare_viral_features(
     - Static Features (Time, Text)
     """
 
-    # 1. Static Features (Time & Text)
-    df = temporal_features.add_date_features(df, "published_at")
+    if df.empty:
+        raise ValueError("No valid videos with sufficient time span found.")
+
+    # 1. Per-Video Aggregation (single pass)
+    # Only each video's earliest and latest snapshot are needed, so locate them
+    # with one linear scan and derive every feature from those rows.
+    # Epoch nanoseconds, reinterpreted in place rather than converted
+    stat_ns = pd.to_datetime(df["stat_time"]).values.view("int64")
+    order, first_idx, last_idx = _snapshot_bounds(df["video_id"], stat_ns)
+    start = df.iloc[order[first_idx]].set_index("video_id")
+    end = df.iloc[order[last_idx]].set_index("video_id")
+    snapshots = pd.Series(last_idx - first_idx + 1, index=start.index)
+
+    delta_ns = stat_ns[order[last_idx]] - stat_ns[order[first_idx]]
+    hours_tracked = pd.Series(delta_ns / 3_600_000_000_000, index=start.index)
+
+    keep = (snapshots >= 2) & (hours_tracked >= 2)
+    if not keep.any():
+        raise ValueError("No valid videos with sufficient time span found.")
+
+    start = start[keep].copy()
+    end = end[keep]
+    hours_tracked = hours_tracked[keep]
+
+    # 2. Static Features (Time & Text)
+    # Computed on one row per video instead of once per stat snapshot.
+    start = temporal_features.add_date_features(start, "published_at")
 
-    if "title" in df.columns:
+    if "title" in start.columns:
         try:
-            df = text_features.extract_title_features(df, title_col="title")
+            start = text_features.extract_title_features(start, title_col="title")
         except Exception:
             # Fallback if text_features fails
-            df["title"] = df["title"].fillna("")
-            df["title_len"] = df["title"].str.len()
-            df["caps_ratio"] = 0
-            df["has_digits"] = 0
+            start["title"] = start["title"].fillna("")
+            start["title_len"] = start["title"].str.len()
+            start["caps_ratio"] = 0
+            start["has_digits"] = 0
     else:
-        df["title_len"] = 0
-        df["caps_ratio"] = 0
-        df["has_digits"] = 0
-
-    features_list = []
-    all_velocities = []
-
-    # First pass: Calculate View Velocities for Labeling
-    for vid, group in df.groupby("video_id"):
-        if len(group) < 2:
-            continue
-
-        group = group.sort_values("stat_time")
+        start["title_len"] = 0
+        start["caps_ratio"] = 0
+        start["has_digits"] = 0
 
-        start_time = group["stat_time"].iloc[0]
-        end_time = group["stat_time"].iloc[-1]
-        time_diff_hours = (end_time - start_time).total_seconds() / 3600.0
-
-        if time_diff_hours < 2:
-            continue
-
-        view_diff = group["views"].iloc[-1] - group["views"].iloc[0]
-        view_velocity = view_diff / (time_diff_hours + 0.1)
-        all_velocities.append(view_velocity)
-
-    if not all_velocities:
-        raise ValueError("No valid videos with sufficient time span found.")
+    # Core metrics
+    denom = hours_tracked + 0.1
+    start_views = start["views"]
+    end_views = end["views"]
+    view_velocity = (end_views - start_views) / denom
 
     # Define "viral" threshold
-    viral_threshold = pd.Series(all_velocities).quantile(viral_threshold_quantile)
-
-    # Second pass: Build Features
-    for vid, group in df.groupby("video_id"):
-        if len(group) < 2:
-            continue
-
-        group = group.sort_values("stat_time")
-        start_row = group.iloc[0]
-        end_row = group.iloc[-1]
-
-        delta = end_row["stat_time"] - start_row["stat_time"]
-        time_diff_hours = delta.total_seconds() / 3600.0
-
-        if time_diff_hours < 2:
-            continue
-
-        # Core metrics
-        start_views = start_row["views"]
-        end_views = end_row["views"]
-        view_diff = end_views - start_views
-        view_velocity = view_diff / (time_diff_hours + 0.1)
-
-        # Engagement Velocities
-        denom = time_diff_hours + 0.1
-        like_velocity = (end_row["likes"] - start_row["likes"]) / denom
-        comment_velocity = (end_row["comments"] - start_row["comments"]) / denom
-
-        # Engagement ratios
-        like_ratio = end_row["likes"] / (end_views + 1)
-        comment_ratio = end_row["comments"] / (end_views + 1)
-
-        # Age
-        delta_age = start_row["stat_time"] - start_row["published_at"]
-        video_age_hours = max(0.5, delta_age.total_seconds() / 3600.0)
-
-        # Advanced Features
-        initial_virality_slope = np.log1p(start_views) / np.log1p(video_age_hours)
-
-        interaction_num = np.log1p(start_row["likes"] + start_row["comments"] * 2)
-        interaction_den = np.log1p(start_views + 1)
-        interaction_density = interaction_num / interaction_den
-
-        # Label
-        is_viral = 1 if view_velocity >= viral_threshold else 0
-
-        features_list.append(
-            {
-                "is_viral": is_viral,
-                "view_velocity": view_velocity,  # Added view_velocity
-                "like_velocity": like_velocity,
-                "comment_velocity": comment_velocity,
-                "start_views": start_views,
-                "log_start_views": np.log1p(start_views),
-                "like_ratio": like_ratio,
-                "comment_ratio": comment_ratio,
-                "video_age_hours": video_age_hours,
-                "duration_seconds": start_row.get("duration_seconds", 0),
-                "hours_tracked": time_diff_hours,
-                "snapshots": len(group),
-                "initial_virality_slope": initial_virality_slope,
-                "interaction_density": interaction_density,
-                "hour_sin": start_row.get("hour_sin", 0),
-                "hour_cos": start_row.get("hour_cos", 0),
-                "title_len": start_row.get("title_len", 0),
-                "caps_ratio": start_row.get("caps_ratio", 0),
-                "has_digits": start_row.get("has_digits", 0),
-            }
-        )
-
-    return pd.DataFrame(features_list)
+    viral_threshold = np.nanquantile(view_velocity.to_numpy(), viral_threshold_quantile)
+
+    # Age
+    delta_age = start["stat_time"] - start["published_at"]
+    video_age_hours = (delta_age.dt.total_seconds() / 3600.0).clip(lower=0.5)
+
+    # Advanced Features
+    initial_virality_slope = np.log1p(start_views) / np.log1p(video_age_hours)
+
+    interaction_num = np.log1p(start["likes"] + start["comments"] * 2)
+    interaction_den = np.log1p(start_views + 1)
+
+    is_viral = (view_velocity >= viral_threshold).astype(np.int8)
+
+    features = pd.DataFrame(
+        {
+            "view_velocity": view_velocity,
+            "like_velocity": (end["likes"] - start["likes"]) / denom,
+            "comment_velocity": (end["comments"] - start["comments"]) / denom,
+            "start_views": start_views,
+            "log_start_views": np.log1p(start_views),
+            "like_ratio": end["likes"] / (end_views + 1),
+            "comment_ratio": end["comments"] / (end_views + 1),
+            "video_age_hours": video_age_hours,
+            "duration_seconds": start.get("duration_seconds", 0),
+            "hours_tracked": hours_tracked,
+            "snapshots": snapshots[keep],
+            "initial_virality_slope": initial_virality_slope,
+            "interaction_density": interaction_num / interaction_den,
+            "hour_sin": start.get("hour_sin", 0),
+            "hour_cos": start.get("hour_cos", 0),
+            "title_len": start.get("title_len", 0),
+            "caps_ratio": start.get("caps_ratio", 0),
+            "has_digits": start.get("has_digits", 0),
+        }
+    )
+
+    # Single contiguous float32 block with NaN/inf zeroed, so training can use
+    # it without another fillna copy
+    values = np.nan_to_num(
+        features.to_numpy(dtype=np.float32), nan=0.0, posinf=0.0, neginf=0.0
+    )
+    final_df = pd.DataFrame(values, columns=features.columns)
+    final_df.insert(0, "is_viral", is_viral.to_numpy())
+
+    return final_df
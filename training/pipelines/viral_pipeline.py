@@ -1,4 +1,10 @@
+import functools
+import inspect
+import io
+import os
+
 import joblib
+import numpy as np
 import pandas as pd
 import yaml
 from deepchecks.tabular import Dataset
@@ -6,24 +12,63 @@ from deepchecks.tabular.suites import data_integrity, model_evaluation
 from prefect import flow, get_run_logger, task
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report
-from sklearn.model_selection import RandomizedSearchCV, train_test_split
+from sklearn.model_selection import (
+    RandomizedSearchCV,
+    StratifiedKFold,
+    train_test_split,
+)
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
 
 from training.evaluation import metrics
 from training.evaluation.validators import ModelValidator
 
 # --- Modular Imports ---
-from training.feature_engineering import viral_features
+from training.feature_engineering import (
+    temporal_features,
+    text_features,
+    viral_features,
+)
+from training.utils import cache
 from training.utils.data_loader import DataLoader
 from training.utils.model_uploader import ModelUploader
 from training.utils.notifications import send_discord_alert
 
+# Prefer the libyaml-backed loader; PyYAML wheels normally ship it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 # --- Configuration ---
 CONFIG_PATH = "training/config/training_config.yaml"
 
+# Above this many training rows SAGA converges faster than liblinear
+SAGA_MIN_SAMPLES = 5000
+
+# Raw columns used by feature engineering; the rest are pruned in SQL
+VIRAL_COLUMNS = [
+    "video_id",
+    "title",
+    "duration_seconds",
+    "published_at",
+    "stat_time",
+    "views",
+    "likes",
+    "comments",
+]
+
+# HTML reports are only rendered when someone will read them
+WRITE_REPORTS = os.getenv("VIRAL_WRITE_REPORTS", "0") == "1"
+
+# Suites are stateless between runs, so build them once per process
+INTEGRITY_SUITE = data_integrity()
+EVAL_SUITE = model_evaluation()
+
 
 def load_config():
     with open(CONFIG_PATH, "r") as f:
-        full_config = yaml.safe_load(f)
+        full_config = yaml.load(f, Loader=SafeLoader)
     return (
         full_config.get("models", {}).get("viral", {}),
         full_config.get("global", {}),
@@ -32,14 +77,44 @@ def load_config():
 
 VIRAL_CONFIG, GLOBAL_CONFIG = load_config()
 
+
+# Modules whose code shapes the featurised frame; editing any of them
+# invalidates the feature cache
+FEATURE_MODULES = (viral_features, temporal_features, text_features)
+
+
+@functools.lru_cache(maxsize=1)
+def _feature_memory():
+    """
+    Featurised frames keyed by a fingerprint of the raw data (opt-in).
+    Built on first use so importing the pipeline creates no cache directory.
+    """
+    return joblib.Memory(
+        os.path.join(cache.CACHE_DIR, "viral_features"),
+        verbose=0,
+        bytes_limit=512 * 1024 * 1024,
+    )
+
+
+def _compute_viral_features(fingerprint: str, raw_df: pd.DataFrame):
+    # `fingerprint` is the cache key; hashing the raw frame itself is skipped
+    return viral_features.prepare_viral_features(raw_df)
+
+
 # --- Tasks ---
 
 
-@task(retries=3, name="Load Video Stats History")
+# Tasks returning DataFrames, models or rendered reports hand them to the next
+# task in-process; opting out of result persistence keeps Prefect from
+# pickling them when PREFECT_RESULTS_PERSIST_BY_DEFAULT is enabled on the worker.
+@task(retries=3, name="Load Video Stats History", persist_result=False)
 def load_data():
     logger = get_run_logger()
     loader = DataLoader()
-    df = loader.get_viral_training_data()
+    cache_path = None
+    if GLOBAL_CONFIG.get("incremental_load"):
+        cache_path = os.path.join(cache.CACHE_DIR, "viral_stats.pkl")
+    df = loader.get_viral_training_data(columns=VIRAL_COLUMNS, cache_path=cache_path)
 
     if df.empty:
         raise ValueError(
@@ -47,13 +122,17 @@ def load_data():
             "video_stats tables have data. Run collector for a few cycles."
         )
 
+    # Hash the string ids once; grouping below then works on integer codes
+    df["video_id"] = df["video_id"].astype("category")
+
     # Diagnostic logging
+    # One hash pass gives both the unique count and the per-video snapshots
+    stat_counts = df["video_id"].value_counts(sort=False)
     logger.info(f"Loaded {len(df)} total stat rows")
-    logger.info(f"Unique videos: {df['video_id'].nunique()}")
+    logger.info(f"Unique videos: {len(stat_counts)}")
 
     # Count videos with multiple stat snapshots (needed for velocity calculation)
-    stat_counts = df.groupby("video_id").size()
-    videos_with_multiple = (stat_counts >= 2).sum()
+    videos_with_multiple = int((stat_counts.to_numpy() >= 2).sum())
     logger.info(
         f"Videos with 2+ stat snapshots (usable for training): {videos_with_multiple}"
     )
@@ -68,13 +147,23 @@ def load_data():
     return df
 
 
-@task(name="Feature Engineering")
+@task(name="Feature Engineering", persist_result=False)
 def prepare_features(df: pd.DataFrame):
     logger = get_run_logger()
 
     # Use modular feature engineering
     try:
-        final_df = viral_features.prepare_viral_features(df)
+        if GLOBAL_CONFIG.get("feature_cache"):
+            # Key on the data and the feature code, so edits invalidate it
+            fingerprint = cache.frame_fingerprint(
+                df, extra="".join(inspect.getsource(m) for m in FEATURE_MODULES)
+            )
+            memory = _feature_memory()
+            cached_features = memory.cache(_compute_viral_features, ignore=["raw_df"])
+            final_df = cached_features(fingerprint, df)
+            memory.reduce_size()
+        else:
+            final_df = viral_features.prepare_viral_features(df)
     except ValueError as e:
         # Re-raise with clear message for Prefect
         raise ValueError(f"Feature Engineering Failed: {e}")
@@ -92,38 +181,45 @@ def prepare_features(df: pd.DataFrame):
     return final_df
 
 
-@task(name="Deepchecks: Integrity")
-def run_integrity(df: pd.DataFrame):
+def render_report(result) -> bytes:
+    """Renders a Deepchecks suite result to HTML bytes without touching disk."""
+    buffer = io.BytesIO()
+    writer = io.TextIOWrapper(buffer, encoding="utf-8")
+    result.save_as_html(writer)
+    writer.flush()
+    # Detach so closing the wrapper does not close the buffer
+    writer.detach()
+    return buffer.getvalue()
+
+
+@task(name="Deepchecks: Integrity", persist_result=False)
+def run_integrity(ds: Dataset):
     logger = get_run_logger()
-    ds = Dataset(df, label="is_viral", cat_features=[])
-    integ = data_integrity()
-    res = integ.run(ds)
-    path = "viral_integrity.html"
-    res.save_as_html(path)
 
-    # Always upload report if repo_id exists
-    repo_id = GLOBAL_CONFIG.get("hf_repo_id")
-    if repo_id:
-        try:
-            uploader = ModelUploader(repo_id)
-            if res.passed():
-                uploader.upload_reports({"integrity": path}, folder="viral/reports")
-            else:
-                logger.warning("Integrity checks failed.")
-                failed_path = path.replace(".html", "_FAILED.html")
-                import os
-
-                os.rename(path, failed_path)
-                uploader.upload_reports(
-                    {"integrity": failed_path}, folder="viral/reports"
-                )
-        except Exception as e:
-            logger.warning(f"Failed to upload integrity report: {e}")
+    # Reuse the last report when the data is unchanged
+    cache_key = None
+    cached = None
+    if GLOBAL_CONFIG.get("deepchecks_cache"):
+        cache_key = cache.frame_fingerprint(ds.data, extra="viral_integrity")
+        cached = cache.load_report(cache_key, require_html=WRITE_REPORTS)
+
+    if cached is None:
+        res = INTEGRITY_SUITE.run(ds)
+        report = render_report(res) if WRITE_REPORTS else None
+        passed = res.passed()
+        if cache_key:
+            cache.save_report(cache_key, report, passed)
+    else:
+        logger.info("Data unchanged. Reusing cached integrity report.")
+        report, passed = cached
+
+    if not passed:
+        logger.warning("Integrity checks failed.")
 
-    return path, res.passed()
+    return report, passed
 
 
-@task(name="Train Logistic Regression")
+@task(name="Train Logistic Regression", persist_result=False)
 def train_model(df: pd.DataFrame):
     logger = get_run_logger()
 
@@ -152,34 +248,78 @@ def train_model(df: pd.DataFrame):
     # Ensure columns exist
     feature_cols = [c for c in feature_cols if c in df.columns]
 
-    X = df[feature_cols].fillna(0)
-    y = df["is_viral"]
-
+    # Keep the label attached so the eval task can reuse the split frames
+    data = df[feature_cols + ["is_viral"]]
+    # prepare_viral_features already zero-fills its float32 output
+    assert not data.isna().to_numpy().any(), "Unexpected NaN in viral features"
+    # float32 halves what every CV worker copies; prepare_viral_features
+    # already emits it, so this only casts frames built elsewhere
+    if (data.dtypes[feature_cols] != np.float32).any():
+        data = data.astype(dict.fromkeys(feature_cols, np.float32))
+    y = data["is_viral"].to_numpy(dtype=np.int8)
+
+    class_counts = np.bincount(y, minlength=2)
     logger.info(f"Training with {len(feature_cols)} features: {feature_cols}")
+    logger.info(f"Class balance (non-viral/viral): {class_counts.tolist()}")
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
+    # Stratify so both splits keep the viral ratio (needs 2+ samples per class)
+    stratify = y if class_counts.min() >= 2 else None
+    train_idx, test_idx = train_test_split(
+        np.arange(len(data)), test_size=0.2, random_state=42, stratify=stratify
     )
+    train_df = data.iloc[train_idx]
+    test_df = data.iloc[test_idx]
+    X_train, y_train = train_df[feature_cols], train_df["is_viral"]
+    X_test, y_test = test_df[feature_cols], test_df["is_viral"]
+
+    # Scale features so the solver converges within max_iter
+    solver = "saga" if len(X_train) > SAGA_MIN_SAMPLES else "liblinear"
+    base_model = Pipeline(
+        [
+            ("scaler", StandardScaler()),
+            (
+                "clf",
+                LogisticRegression(
+                    solver=solver, max_iter=1000, class_weight="balanced"
+                ),
+            ),
+        ]
+    )
+    logger.info(f"Using {solver} solver for {len(X_train)} training rows")
 
     # Tuning Config
     tuning_conf = VIRAL_CONFIG.get("tuning", {})
 
     if tuning_conf:
-        base_model = LogisticRegression(max_iter=1000, class_weight="balanced")
+        param_distributions = {
+            f"clf__{name}": values
+            for name, values in tuning_conf.get("params", {}).items()
+        }
+        n_iter = tuning_conf.get("n_iter", 10)
+        # Shuffled folds keep the viral ratio without depending on row order
+        cv = StratifiedKFold(
+            n_splits=tuning_conf.get("cv", 3), shuffle=True, random_state=42
+        )
+        # No more workers than fits, and at most two fold copies queued each
+        n_jobs = min(os.cpu_count() or 1, n_iter * cv.get_n_splits())
         search = RandomizedSearchCV(
             estimator=base_model,
-            param_distributions=tuning_conf.get("params", {}),
-            n_iter=tuning_conf.get("n_iter", 10),
-            cv=tuning_conf.get("cv", 3),
+            param_distributions=param_distributions,
+            n_iter=n_iter,
+            cv=cv,
             scoring="f1",
-            n_jobs=-1,
-            verbose=1,
+            n_jobs=n_jobs,
+            pre_dispatch="2*n_jobs",
+            return_train_score=False,
+            verbose=0,
         )
-        search.fit(X_train, y_train)
+        # One BLAS thread per worker avoids oversubscribing the cores
+        with joblib.parallel_backend("loky", inner_max_num_threads=1):
+            search.fit(X_train, y_train)
         model = search.best_estimator_
         logger.info(f"Best hyperparameters: {search.best_params_}")
     else:
-        model = LogisticRegression(class_weight="balanced", max_iter=1000)
+        model = base_model
         model.fit(X_train, y_train)
 
     preds = model.predict(X_test)
@@ -190,29 +330,41 @@ def train_model(df: pd.DataFrame):
     logger.info(f"Classification Report:\n{report}")
     logger.info(f"Training Metrics: {eval_metrics}")
 
-    return model, X_train, X_test, y_train, y_test, eval_metrics
+    return model, train_df, test_df, feature_cols, eval_metrics
 
 
-@task(name="Deepchecks: Eval")
-def run_eval(model, X_train, X_test, y_train, y_test):
-    train_ds = Dataset(pd.concat([X_train, y_train], axis=1), label="is_viral")
-    test_ds = Dataset(pd.concat([X_test, y_test], axis=1), label="is_viral")
+@task(name="Deepchecks: Eval", persist_result=False)
+def run_eval(model, train_df, test_df, feature_cols):
+    logger = get_run_logger()
 
-    suite = model_evaluation()
-    res = suite.run(train_dataset=train_ds, test_dataset=test_ds, model=model)
-    path = "viral_eval.html"
-    res.save_as_html(path)
+    # Reuse the last report when the data and model are unchanged
+    cache_key = None
+    cached = None
+    if GLOBAL_CONFIG.get("deepchecks_cache"):
+        cache_key = cache.frame_fingerprint(
+            train_df, test_df, extra=f"viral_eval:{joblib.hash(model)}"
+        )
+        cached = cache.load_report(cache_key, require_html=WRITE_REPORTS)
 
-    # Always upload report
-    repo_id = GLOBAL_CONFIG.get("hf_repo_id")
-    if repo_id:
-        try:
-            uploader = ModelUploader(repo_id)
-            uploader.upload_reports({"eval": path}, folder="viral/reports")
-        except Exception:
-            pass
+    if cached is None:
+        # Declare the features in the order the model was fitted on; sklearn
+        # rejects predictions on reordered columns
+        train_ds = Dataset(
+            train_df, label="is_viral", features=feature_cols, cat_features=[]
+        )
+        test_ds = Dataset(
+            test_df, label="is_viral", features=feature_cols, cat_features=[]
+        )
+
+        res = EVAL_SUITE.run(train_dataset=train_ds, test_dataset=test_ds, model=model)
+        report = render_report(res) if WRITE_REPORTS else None
+        if cache_key:
+            cache.save_report(cache_key, report, res.passed())
+    else:
+        logger.info("Data and model unchanged. Reusing cached eval report.")
+        report, _ = cached
 
-    return path
+    return report
 
 
 @task(name="Validate & Upload")
@@ -230,14 +382,29 @@ def validate_and_upload(model, X_test, y_test, reports):
         model, old_model, X_test, y_test, metric_name=metric_name
     )
 
+    # Reports are published every run, the model only when it wins
+    files = {
+        f"viral/reports/{name}_latest.html": report
+        for name, report in reports.items()
+        if report is not None
+    }
+    uploader = ModelUploader(repo_id)
+
     if passed:
         logger.info(f"Promoting model. New {metric_name}: {new_score:.4f}")
-        joblib.dump(model, "viral_model.pkl")
-        uploader = ModelUploader(repo_id)
-        uploader.upload_file("viral_model.pkl", "viral/model.pkl")
-        uploader.upload_reports(reports, folder="viral/reports")
+        # zlib is built in, so the API can load it without extra codecs
+        joblib.dump(model, "viral_model.pkl", compress=3, protocol=5)
+        files["viral/model.pkl"] = "viral_model.pkl"
+        # Push the model and its reports together as one Hub commit
+        uploader.bulk_upload(files, "Promote viral model")
         return "PROMOTED"
 
+    if files:
+        try:
+            uploader.bulk_upload(files, "Update viral reports")
+        except Exception as e:
+            logger.warning(f"Failed to upload reports: {e}")
+
     return "DISCARDED"
 
 
@@ -261,21 +428,30 @@ def viral_training_flow():
         run_metrics["Training_Samples"] = len(df)
         run_metrics["Features"] = len(df.columns) - 1
 
-        # 3. Integrity Checks
-        integrity_path, passed = run_integrity(df)
+        # 3 & 4. Integrity Checks and Training are independent, so run them
+        # concurrently and join before evaluation
+        full_ds = Dataset(df, label="is_viral", cat_features=[])
+        integrity_future = run_integrity.submit(full_ds)
+        train_future = train_model.submit(df)
+
+        integrity_report, passed = integrity_future.result()
         if not passed:
             logger.warning("Data Integrity Failed. Continuing pipeline...")
 
-        # 4. Train Model
-        best_model, Xt, Xv, yt, yv, eval_metrics = train_model(df)
+        best_model, train_df, test_df, feature_cols, eval_metrics = (
+            train_future.result()
+        )
         run_metrics.update(eval_metrics)
 
         # 5. Evaluate
-        eval_path = run_eval(best_model, Xt, Xv, yt, yv)
+        eval_report = run_eval(best_model, train_df, test_df, feature_cols)
 
         # 6. Validate & Upload
         status = validate_and_upload(
-            best_model, Xv, yv, {"integrity": integrity_path, "eval": eval_path}
+            best_model,
+            test_df[feature_cols],
+            test_df["is_viral"],
+            {"integrity": integrity_report, "eval": eval_report},
         )
 
         run_metrics["Deployment"] = status
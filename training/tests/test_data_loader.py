@@ -0,0 +1,60 @@
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from training.utils.data_loader import DataLoader
+
+COLUMNS = ["video_id", "stat_time", "views", "likes", "comments"]
+
+
+@pytest.fixture
+def loader():
+    return DataLoader(engine=MagicMock(url="postgresql://test"))
+
+
+def stats_rows(video_id, hours_ago, views):
+    now = pd.Timestamp.now(tz="UTC").floor("h")
+    return pd.DataFrame(
+        {
+            "video_id": [video_id] * len(hours_ago),
+            "stat_time": [now - pd.Timedelta(hours=h) for h in hours_ago],
+            "views": views,
+            "likes": [v // 10 for v in views],
+            "comments": [v // 100 for v in views],
+        }
+    )
+
+
+def test_viral_training_data_incremental_load(loader, tmp_path):
+    cache_path = str(tmp_path / "viral_stats.pkl")
+    first = stats_rows("a", [3, 2], [100, 200])
+    delta = stats_rows("a", [1], [300])
+
+    with patch.object(DataLoader, "_read_sql", side_effect=[first, delta]) as read:
+        loader.get_viral_training_data(columns=COLUMNS, cache_path=cache_path)
+        df = loader.get_viral_training_data(columns=COLUMNS, cache_path=cache_path)
+
+    # The first load fetches everything, the second only what is newer
+    assert read.call_args_list[0].kwargs["params"]["since"] == "-infinity"
+    assert (
+        read.call_args_list[1].kwargs["params"]["since"]
+        == first["stat_time"].max().to_pydatetime()
+    )
+    assert df["views"].tolist() == [100, 200, 300]
+
+
+def test_viral_training_data_no_new_rows(loader, tmp_path):
+    cache_path = str(tmp_path / "viral_stats.pkl")
+    first = stats_rows("a", [3, 2], [100, 200])
+    # An empty chunked read comes back with object columns
+    empty = pd.DataFrame({c: pd.Series(dtype=object) for c in COLUMNS})
+
+    with patch.object(DataLoader, "_read_sql", side_effect=[first, empty, empty]):
+        loader.get_viral_training_data(columns=COLUMNS, cache_path=cache_path)
+        df = loader.get_viral_training_data(columns=COLUMNS, cache_path=cache_path)
+        again = loader.get_viral_training_data(columns=COLUMNS, cache_path=cache_path)
+
+    pd.testing.assert_frame_equal(df, first)
+    # The cache written back keeps its numeric counters
+    pd.testing.assert_frame_equal(again, first)
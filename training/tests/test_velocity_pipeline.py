@@ -7,7 +7,7 @@ import pytest
 from training.pipelines.velocity_pipeline import prepare_features, train_model
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_data():
     return pd.DataFrame(
         {
@@ -29,7 +29,7 @@ def sample_data():
 @patch("training.pipelines.velocity_pipeline.get_run_logger")
 def test_prepare_features(mock_logger, sample_data):
     # Test feature engineering logic
-    df = prepare_features.fn(sample_data)
+    df = prepare_features.fn(sample_data.copy())
 
     assert "publish_hour" in df.columns
     assert "publish_day" in df.columns
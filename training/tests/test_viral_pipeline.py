@@ -1,79 +1,138 @@
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pandas as pd
 import pytest
-
-from training.pipelines.viral_pipeline import prepare_features, train_model
+from deepchecks.core.check_result import CheckFailure
+from sklearn.linear_model import LogisticRegression
+
+from training.pipelines.viral_pipeline import (
+    EVAL_SUITE,
+    prepare_features,
+    run_eval,
+    train_model,
+)
 
 
-@pytest.fixture
-def trending_history():
-    # Create a history for a single video that goes viral
-    # Rank drops (improves) over time
+@pytest.fixture(scope="module")
+def stats_history():
+    # Stat snapshots for three videos published at the same time
+    published = pd.Timestamp("2023-01-01 08:00:00")
     data = []
-    # Video 1: Starts at 50, goes to 5 (Viral)
-    for i in range(5):
-        data.append(
-            {
-                "video_id": "v1",
-                "rank": 50 - (i * 10),  # 50, 40, 30, 20, 10
-                "discovered_at": pd.Timestamp("2023-01-01 10:00:00")
-                + pd.Timedelta(hours=i),
-            }
-        )
-    # Video 2: Starts at 100, stays 100 (Not Viral)
-    for i in range(5):
-        data.append(
-            {
-                "video_id": "v2",
-                "rank": 100,
-                "discovered_at": pd.Timestamp("2023-01-01 10:00:00")
-                + pd.Timedelta(hours=i),
-            }
-        )
-
-    return pd.DataFrame(data)
+    # Video 1: Gains 1000 views/hour (Viral)
+    # Video 2: Gains 10 views/hour (Not Viral)
+    for vid, gain in [("v1", 1000), ("v2", 10)]:
+        for i in range(5):
+            data.append(
+                {
+                    "video_id": vid,
+                    "title": "Big NEWS 2023",
+                    "duration_seconds": 120,
+                    "published_at": published,
+                    "stat_time": pd.Timestamp("2023-01-01 10:00:00")
+                    + pd.Timedelta(hours=i),
+                    "views": 100 + gain * i,
+                    "likes": 10 + i,
+                    "comments": 1 + i,
+                }
+            )
+    # Video 3: Single snapshot (Dropped, no velocity)
+    data.append(
+        {
+            "video_id": "v3",
+            "title": "lonely",
+            "duration_seconds": 60,
+            "published_at": published,
+            "stat_time": pd.Timestamp("2023-01-01 10:00:00"),
+            "views": 50,
+            "likes": 1,
+            "comments": 0,
+        }
+    )
+
+    # Shuffle to make sure snapshots are ordered by stat_time internally
+    return pd.DataFrame(data).sample(frac=1, random_state=0)
 
 
 @patch("training.pipelines.viral_pipeline.get_run_logger")
-def test_prepare_features(mock_logger, trending_history):
-    df = prepare_features.fn(trending_history)
+def test_prepare_features(mock_logger, stats_history):
+    df = prepare_features.fn(stats_history.copy())
 
-    assert len(df) == 2  # 2 videos
+    assert len(df) == 2  # v3 has a single snapshot
 
-    v1 = df[df["start_rank"] == 50].iloc[0]
-    v2 = df[df["start_rank"] == 100].iloc[0]
+    df = df.sort_values("view_velocity")
+    v1 = df.iloc[-1]
+    v2 = df.iloc[0]
 
-    # Check Viral Label (Rank <= 10 is viral)
-    # v1 ends at 10 -> Viral
+    # Check Viral Label (top 20% view velocity is viral)
     assert v1["is_viral"] == 1
-    # v2 ends at 100 -> Not Viral
     assert v2["is_viral"] == 0
 
     # Check Velocity
-    # v1: Rank change 10 - 50 = -40. Time diff 4 hours (14400s).
-    # Velocity should be negative (rank improving)
-    assert v1["velocity"] < 0
+    # v1: 4000 views over 4 hours (denominator padded by 0.1)
+    assert v1["view_velocity"] == pytest.approx(4000 / 4.1)
+    assert v1["snapshots"] == 5
+    assert v1["hours_tracked"] == pytest.approx(4.0)
 
 
+@patch("training.pipelines.viral_pipeline.get_run_logger")
 @patch("training.pipelines.viral_pipeline.RandomizedSearchCV")
 @patch(
     "training.pipelines.viral_pipeline.VIRAL_CONFIG",
     {"tuning": {"params": {}, "n_iter": 1}},
 )
-def test_train_model(MockSearch):
+def test_train_model(MockSearch, mock_logger):
     df = pd.DataFrame(
         {
-            "velocity": [-0.5, -0.1, 0.0, 0.1],
-            "start_rank": [50, 20, 100, 90],
-            "is_viral": [1, 1, 0, 0],
+            "like_velocity": [5.0, 4.0, 0.1, 0.2, 3.0, 0.0, 0.1, 0.3, 6.0, 0.2],
+            "start_views": [50, 20, 100, 90, 40, 80, 70, 60, 30, 10],
+            "is_viral": [1, 1, 0, 0, 1, 0, 0, 0, 1, 0],
         }
     )
 
     mock_search = MockSearch.return_value
-    mock_search.best_estimator_ = "BestModel"
+    best_model = MagicMock()
+    best_model.predict.side_effect = lambda X: np.zeros(len(X), dtype=int)
+    mock_search.best_estimator_ = best_model
 
-    model, Xt, Xv, yt, yv, metrics = train_model.fn(df)
+    model, train_df, test_df, feature_cols, metrics = train_model.fn(df)
 
-    assert model == "BestModel"
+    assert model is best_model
     MockSearch.assert_called()
+    assert feature_cols == ["like_velocity", "start_views"]
+    # Split frames keep the label attached for the eval task
+    assert "is_viral" in train_df.columns
+    assert len(train_df) + len(test_df) == len(df)
+
+
+@patch("training.pipelines.viral_pipeline.get_run_logger")
+@patch("training.pipelines.viral_pipeline.GLOBAL_CONFIG", {})
+def test_run_eval_predicts_on_fitted_feature_order(mock_logger):
+    rng = np.random.default_rng(0)
+    # Frame columns deliberately differ in order from the fitted features
+    df = pd.DataFrame(
+        {
+            "start_views": rng.random(200, dtype=np.float32),
+            "log_start_views": rng.random(200, dtype=np.float32),
+            "like_velocity": rng.random(200, dtype=np.float32),
+        }
+    )
+    df["is_viral"] = (df["like_velocity"] > 0.7).astype(int)
+    feature_cols = ["log_start_views", "start_views", "like_velocity"]
+    train_df, test_df = df.iloc[:150], df.iloc[150:]
+    model = LogisticRegression().fit(train_df[feature_cols], train_df["is_viral"])
+
+    results = []
+
+    def run_suite(**kwargs):
+        results.append(EVAL_SUITE.run(**kwargs))
+        return results[-1]
+
+    with patch("training.pipelines.viral_pipeline.EVAL_SUITE") as suite:
+        suite.run.side_effect = run_suite
+        run_eval.fn(model, train_df, test_df, feature_cols)
+
+    failures = [
+        str(r.exception) for r in results[0].results if isinstance(r, CheckFailure)
+    ]
+    assert not [f for f in failures if "Feature names" in f]
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+CACHE_DIR = ".cache"
+
+
+def frame_fingerprint(*frames: pd.DataFrame, extra: str = "") -> str:
+    """
+    Content hash of one or more DataFrames.
+    The index is ignored; column names and values are hashed.
+
+    Args:
+        frames: DataFrames to fingerprint (order matters).
+        extra (str): Additional key material, e.g. a model hash or parameters.
+    """
+    digest = hashlib.sha256(extra.encode("utf-8"))
+    for frame in frames:
+        digest.update(",".join(map(str, frame.columns)).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def load_report(key: str, require_html: bool = False):
+    """
+    Loads a cached Deepchecks result and its HTML report, if one was rendered.
+
+    Args:
+        key (str): Cache key the result was saved under.
+        require_html (bool): Treat a result cached without HTML as a miss.
+
+    Returns:
+        (html_bytes or None, passed), or None on a cache miss.
+    """
+    html_path = os.path.join(CACHE_DIR, "deepchecks", f"{key}.html")
+    meta_path = os.path.join(CACHE_DIR, "deepchecks", f"{key}.json")
+    has_html = os.path.exists(html_path)
+    if not os.path.exists(meta_path) or (require_html and not has_html):
+        return None
+
+    report = None
+    if has_html:
+        with open(html_path, "rb") as f:
+            report = f.read()
+    with open(meta_path, "r") as f:
+        return report, json.load(f)["passed"]
+
+
+def save_report(key: str, report, passed: bool):
+    """
+    Stores a Deepchecks result under `key`, with its HTML report unless
+    `report` is None (rendering disabled).
+    """
+    report_dir = os.path.join(CACHE_DIR, "deepchecks")
+    os.makedirs(report_dir, exist_ok=True)
+
+    if report is not None:
+        with open(os.path.join(report_dir, f"{key}.html"), "wb") as f:
+            f.write(report)
+    with open(os.path.join(report_dir, f"{key}.json"), "w") as f:
+        json.dump({"passed": bool(passed)}, f)
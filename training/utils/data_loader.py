@@ -1,11 +1,297 @@
+import functools
 import os
 
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import Integer, bindparam, create_engine, text
+
+# Bump when the rows or columns returned by get_viral_training_data change, so
+# stale incremental caches are rebuilt from scratch.
+VIRAL_CACHE_VERSION = 2
+
+# Matches the video_stats retention policy (collector/models.py); cached rows
+# older than this no longer exist in the database
+STATS_RETENTION_DAYS = 60
+
+# Rows fetched per round-trip when streaming large result sets
+READ_CHUNK_SIZE = 50_000
+
+# Count columns narrowed after loading. Signed, so deltas between two
+# snapshots (e.g. likes removed) cannot wrap around.
+COUNTER_COLUMNS = (
+    "views",
+    "likes",
+    "comments",
+    "start_views",
+    "start_likes",
+    "start_comments",
+    "target_views",
+    "end_likes",
+    "end_comments",
+    "duration_seconds",
+)
+
+# Output column -> SQL expression for get_viral_training_data projections
+VIRAL_SELECT_COLUMNS = {
+    "video_id": "v.video_id",
+    "title": "v.title",
+    "duration_seconds": "v.duration_seconds",
+    "published_at": "v.published_at",
+    "first_discovered": "d.first_discovered",
+    "stat_time": "s.time as stat_time",
+    "views": "s.views",
+    "likes": "s.likes",
+    "comments": "s.comments",
+}
+
+
+# Queries compiled once at import; parameter values are bound per call.
+# First/last snapshots are LATERAL probes on the (video_id, time) primary key,
+# which Postgres scans forwards or backwards instead of sorting video_stats.
+_TRAINING_PAIRS_SQL = text(
+    """
+SELECT v.video_id, v.title, v.duration_seconds,
+    v.published_at, v.channel_id,
+    e.start_views, e.start_likes, e.start_comments,
+    t.target_views
+FROM videos v
+CROSS JOIN LATERAL (
+    SELECT views as start_views, likes as start_likes,
+        comments as start_comments, time as start_time
+    FROM video_stats s
+    WHERE s.video_id = v.video_id
+    ORDER BY s.time ASC
+    LIMIT 1
+) e
+CROSS JOIN LATERAL (
+    SELECT views as target_views, time as target_time
+    FROM video_stats s
+    WHERE s.video_id = v.video_id
+        AND s.time BETWEEN (
+            v.published_at + :low_hours * INTERVAL '1 hour'
+        ) AND (
+            v.published_at + :high_hours * INTERVAL '1 hour'
+        )
+    ORDER BY s.time DESC
+    LIMIT 1
+) t
+"""
+).bindparams(
+    bindparam("low_hours", 144, type_=Integer),
+    bindparam("high_hours", 192, type_=Integer),
+)
+
+_VELOCITY_TRAINING_SQL = text(
+    """
+WITH discovered_videos AS (
+    SELECT DISTINCT video_id, MIN(discovered_at) as first_discovered
+    FROM search_discovery
+    GROUP BY video_id
+)
+SELECT 
+    v.video_id,
+    v.title,
+    v.tags,
+    v.duration_seconds,
+    v.published_at,
+    v.channel_id,
+    v.category_id,
+    d.first_discovered,
+    e.start_views,
+    e.start_likes,
+    e.start_comments,
+    e.start_time,
+    l.target_views,
+    l.end_likes,
+    l.end_comments,
+    l.end_time,
+    EXTRACT(EPOCH FROM (l.end_time - e.start_time))/3600 as hours_tracked
+FROM discovered_videos d
+JOIN videos v ON d.video_id = v.video_id
+CROSS JOIN LATERAL (
+    SELECT 
+        views as start_views, 
+        likes as start_likes, 
+        comments as start_comments, 
+        time as start_time
+    FROM video_stats s
+    WHERE s.video_id = d.video_id
+    ORDER BY s.time ASC
+    LIMIT 1
+) e
+CROSS JOIN LATERAL (
+    SELECT 
+        views as target_views,
+        likes as end_likes,
+        comments as end_comments,
+        time as end_time
+    FROM video_stats s
+    WHERE s.video_id = d.video_id
+    ORDER BY s.time DESC
+    LIMIT 1
+) l
+WHERE l.end_time > e.start_time + :min_hours * INTERVAL '1 hour'
+ORDER BY d.first_discovered DESC
+"""
+).bindparams(bindparam("min_hours", 2, type_=Integer))
+
+_TRAINING_PAIRS_FLEXIBLE_SQL = text(
+    """
+SELECT v.video_id, v.title, v.duration_seconds,
+    v.published_at, v.channel_id,
+    e.start_views, e.start_likes, e.start_comments, 
+    l.target_views,
+    EXTRACT(EPOCH FROM (l.target_time - e.start_time))/3600
+        as hours_between
+FROM videos v
+CROSS JOIN LATERAL (
+    SELECT views as start_views, likes as start_likes,
+        comments as start_comments, time as start_time
+    FROM video_stats s
+    WHERE s.video_id = v.video_id
+    ORDER BY s.time ASC
+    LIMIT 1
+) e
+CROSS JOIN LATERAL (
+    SELECT views as target_views, time as target_time
+    FROM video_stats s
+    WHERE s.video_id = v.video_id
+    ORDER BY s.time DESC
+    LIMIT 1
+) l
+WHERE l.target_time > e.start_time + INTERVAL '1 hour'
+"""
+)
+
+_VIRAL_TRAINING_SQL = """
+WITH discovered_videos AS (
+    -- Get all videos found via search (more entries than trending)
+    SELECT DISTINCT video_id, MIN(discovered_at) as first_discovered
+    FROM search_discovery
+    GROUP BY video_id
+),
+video_stats_series AS (
+    -- Get stats time series for discovered videos
+    SELECT 
+        s.video_id,
+        s.time,
+        s.views,
+        s.likes,
+        s.comments
+    FROM video_stats s
+    INNER JOIN discovered_videos d ON s.video_id = d.video_id
+    -- Videos discovered since the last load bring their full history
+    WHERE s.time > CAST(:since AS timestamptz)
+        OR d.first_discovered > CAST(:since AS timestamptz)
+)
+SELECT 
+    {select_list}
+FROM discovered_videos d
+JOIN videos v ON d.video_id = v.video_id
+JOIN video_stats_series s ON d.video_id = s.video_id
+ORDER BY d.video_id, s.time ASC
+"""
+
+
+@functools.lru_cache(maxsize=8)
+def _viral_training_sql(columns):
+    """Compiles the viral training query once per projected column set."""
+    select_list = ",\n    ".join(VIRAL_SELECT_COLUMNS[c] for c in columns)
+    return text(_VIRAL_TRAINING_SQL.format(select_list=select_list))
+
+
+# Pooled engines by database URL, shared by all loaders in the process
+_ENGINES = {}
+
+
+def _get_engine(db_url):
+    """Returns the shared pooled engine for `db_url`, creating it on first use."""
+    engine = _ENGINES.get(db_url)
+    if engine is None:
+        engine = _ENGINES[db_url] = create_engine(
+            db_url,
+            pool_size=8,
+            max_overflow=16,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+        )
+    return engine
+
+
+def _dispose_inherited_engines():
+    """
+    Gives each engine a fresh pool in a forked child (SQLAlchemy's fork
+    guidance). close=False leaves the parent's sockets untouched instead of
+    closing or terminating connections the parent is still using.
+    """
+    for engine in _ENGINES.values():
+        engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_inherited_engines)
+
+
+def _downcast_counters(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stores int64 count columns as int32 when every value fits.
+    Narrower types are avoided so feature arithmetic (sums, +1) cannot overflow.
+    """
+    int32 = np.iinfo(np.int32)
+    for col in COUNTER_COLUMNS:
+        if col in df.columns and df[col].dtype == np.int64 and len(df):
+            values = df[col].to_numpy()
+            if int32.min < values.min() and values.max() < int32.max // 2:
+                df[col] = values.astype(np.int32)
+    return df
+
+
+def _concat_chunks(chunks) -> pd.DataFrame:
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True, copy=False)
+
+
+def _cached_read(method):
+    """
+    Memoises a loader method per DataLoader instance, keyed on its arguments,
+    so one pipeline run never scans the same table twice.
+    Callers get a copy, so mutating a result never alters the cache. That
+    doubles the result's footprint, so the training inputs each pipeline
+    reads once are not memoised.
+    """
+
+    def freeze(value):
+        return tuple(value) if isinstance(value, list) else value
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (
+            method.__name__,
+            tuple(freeze(a) for a in args),
+            frozenset((k, freeze(v)) for k, v in kwargs.items()),
+        )
+        if key not in self._cache:
+            self._cache[key] = method(self, *args, **kwargs)
+        return self._cache[key].copy()
+
+    return wrapper
 
 
 class DataLoader:
-    def __init__(self):
+    def __init__(self, engine=None):
+        """
+        Args:
+            engine: Optional pre-built SQLAlchemy engine (e.g. for tests).
+                Defaults to the shared engine for DATABASE_URL.
+        """
+        self._cache = {}
+
+        if engine is not None:
+            self.engine = engine
+            self.db_url = str(engine.url)
+            return
+
         self.db_url = os.getenv("DATABASE_URL")
 
         if not self.db_url:
@@ -18,24 +304,50 @@ class DataLoader:
         if self.db_url.startswith("postgres://"):
             self.db_url = self.db_url.replace("postgres://", "postgresql://", 1)
 
-        self.engine = create_engine(self.db_url)
+        self.engine = _get_engine(self.db_url)
+
+    def invalidate(self):
+        """Drops all memoised query results so the next reads hit the database."""
+        self._cache.clear()
+
+    def _iter_sql(self, query, params=None):
+        """
+        Streams a large query through a server-side cursor.
+        Yields DataFrames of up to READ_CHUNK_SIZE rows instead of letting the
+        driver buffer the whole result set.
+        """
+        with self.engine.connect().execution_options(stream_results=True) as conn:
+            yield from pd.read_sql(
+                query, conn, params=params, chunksize=READ_CHUNK_SIZE
+            )
+
+    def _read_sql(self, query, params=None):
+        """Reads a large query in streamed chunks into a single DataFrame."""
+        return _concat_chunks(list(self._iter_sql(query, params=params)))
 
     def get_video_metadata(self):
         query = (
             "SELECT video_id, title, tags, duration_seconds, published_at "
             "FROM videos"
         )
-        return pd.read_sql(query, self.engine)
+        return self._read_sql(query)
 
     def get_joined_data(self):
-        # Helper for static models
-        meta = self.get_video_metadata()
-        stats = pd.read_sql(
-            "SELECT DISTINCT ON (video_id) * FROM video_stats "
-            "ORDER BY video_id, time DESC",
-            self.engine,
-        )
-        return pd.merge(meta, stats, on="video_id", how="inner")
+        # Helper for static models: metadata plus each video's latest stats,
+        # joined in the database
+        query = """
+            SELECT v.video_id, v.title, v.tags, v.duration_seconds, v.published_at,
+                s.time, s.views, s.likes, s.comments
+            FROM videos v
+            CROSS JOIN LATERAL (
+                SELECT time, views, likes, comments
+                FROM video_stats
+                WHERE video_id = v.video_id
+                ORDER BY time DESC
+                LIMIT 1
+            ) s
+        """
+        return self._read_sql(query)
 
     def get_latest_stats(self):
         return pd.read_sql(
@@ -44,53 +356,84 @@ class DataLoader:
             self.engine,
         )
 
-    def get_trending_history(self):
-        return pd.read_sql(
-            "SELECT * FROM trending_discovery " "ORDER BY video_id, discovered_at ASC",
-            self.engine,
+    @_cached_read
+    def get_trending_history(self, columns=None):
+        """
+        Args:
+            columns: Optional list of columns to select. Defaults to all.
+        """
+        select_list = "*"
+        if columns:
+            quote = self.engine.dialect.identifier_preparer.quote
+            select_list = ", ".join(quote(c) for c in columns)
+        return self._read_sql(
+            f"SELECT {select_list} FROM trending_discovery "
+            "ORDER BY video_id, discovered_at ASC"
         )
 
-    def get_viral_training_data(self):
+    def get_viral_training_data(self, columns=None, cache_path=None):
         """
         Fetch video discovery + stats for viral prediction.
         Uses search_discovery (more data) joined with video_stats time series.
+
+        Args:
+            columns: Optional subset of VIRAL_SELECT_COLUMNS to fetch, so unused
+                columns are pruned in the database. Defaults to all.
+            cache_path: Optional pickle file for incremental loading. When set,
+                only stats newer than the cached max(stat_time) are fetched,
+                plus the full history of videos discovered since then. They are
+                merged into the cached rows (minus those past the video_stats
+                retention window) and written back.
         """
-        query = text(
-            """
-            WITH discovered_videos AS (
-                -- Get all videos found via search (more entries than trending)
-                SELECT DISTINCT video_id, MIN(discovered_at) as first_discovered
-                FROM search_discovery
-                GROUP BY video_id
-            ),
-            video_stats_series AS (
-                -- Get stats time series for discovered videos
-                SELECT 
-                    s.video_id,
-                    s.time,
-                    s.views,
-                    s.likes,
-                    s.comments
-                FROM video_stats s
-                INNER JOIN discovered_videos d ON s.video_id = d.video_id
+        columns = list(columns or VIRAL_SELECT_COLUMNS)
+        unknown = set(columns) - set(VIRAL_SELECT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown viral training columns: {sorted(unknown)}")
+        if cache_path and not {"video_id", "stat_time"} <= set(columns):
+            raise ValueError(
+                "Incremental loading requires the video_id and stat_time columns."
             )
-            SELECT 
-                v.video_id,
-                v.title,
-                v.duration_seconds,
-                v.published_at,
-                d.first_discovered,
-                s.time as stat_time,
-                s.views,
-                s.likes,
-                s.comments
-            FROM discovered_videos d
-            JOIN videos v ON d.video_id = v.video_id
-            JOIN video_stats_series s ON d.video_id = s.video_id
-            ORDER BY d.video_id, s.time ASC
-        """
-        )
-        return pd.read_sql(query, self.engine)
+
+        cached = None
+        since = "-infinity"
+        if cache_path and os.path.exists(cache_path):
+            payload = pd.read_pickle(cache_path)
+            if (
+                payload.get("version") == VIRAL_CACHE_VERSION
+                and payload.get("columns") == columns
+                and len(payload["data"])
+            ):
+                cached = payload["data"]
+                since = cached["stat_time"].max().to_pydatetime()
+
+        query = _viral_training_sql(tuple(columns))
+        df = self._read_sql(query, params={"since": since})
+
+        if cache_path:
+            if cached is not None:
+                cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(
+                    days=STATS_RETENTION_DAYS
+                )
+                if cached["stat_time"].dt.tz is None:
+                    cutoff = cutoff.tz_localize(None)
+                cached = cached[cached["stat_time"] >= cutoff]
+                if df.empty:
+                    # An empty read has object columns; concatenating it
+                    # would upcast the cached counters to object
+                    df = cached.reset_index(drop=True)
+                else:
+                    # Newly discovered videos may overlap rows already cached;
+                    # keep the full-load row order so both paths agree
+                    df = (
+                        pd.concat([cached, df], ignore_index=True)
+                        .drop_duplicates(["video_id", "stat_time"], keep="last")
+                        .sort_values(["video_id", "stat_time"], ignore_index=True)
+                    )
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            payload = {"version": VIRAL_CACHE_VERSION, "columns": columns, "data": df}
+            pd.to_pickle(payload, cache_path)
+
+        return df
 
     def get_training_pairs(self, target_hours=168, window_hours=24):
         """
@@ -100,71 +443,18 @@ class DataLoader:
             target_hours: Target time after publish (default 168 = 7 days)
             window_hours: Flexibility window around target (default ±24 hours)
         """
-        query = text(
-            f"""
-            WITH 
-            earliest_stats AS (
-                SELECT DISTINCT ON (video_id) video_id, views as start_views, 
-                likes as start_likes, comments as start_comments, time as start_time
-                FROM video_stats 
-                ORDER BY video_id, time ASC
-            ),
-            target_stats AS (
-                SELECT DISTINCT ON (video_id) s.video_id, s.views as target_views, 
-                s.time as target_time
-                FROM video_stats s 
-                JOIN videos v ON s.video_id = v.video_id
-                WHERE s.time BETWEEN (
-                    v.published_at + INTERVAL '{target_hours - window_hours} hours'
-                ) AND (
-                    v.published_at + INTERVAL '{target_hours + window_hours} hours'
-                )
-                ORDER BY s.video_id, s.time DESC
-            )
-            SELECT v.video_id, v.title, v.duration_seconds,
-                v.published_at, v.channel_id,
-                e.start_views, e.start_likes, e.start_comments,
-                t.target_views
-            FROM videos v
-            JOIN earliest_stats e ON v.video_id = e.video_id
-            JOIN target_stats t ON v.video_id = t.video_id
-            """
-        )
-        return pd.read_sql(query, self.engine)
+        params = {
+            "low_hours": target_hours - window_hours,
+            "high_hours": target_hours + window_hours,
+        }
+        return _downcast_counters(self._read_sql(_TRAINING_PAIRS_SQL, params=params))
 
     def get_training_pairs_flexible(self):
         """
         Fallback: Get training pairs using earliest and latest stats for each video.
         Use when strict time windows return no data.
         """
-        query = text(
-            """
-            WITH 
-            earliest_stats AS (
-                SELECT DISTINCT ON (video_id) video_id, views as start_views, 
-                likes as start_likes, comments as start_comments, time as start_time
-                FROM video_stats 
-                ORDER BY video_id, time ASC
-            ),
-            latest_stats AS (
-                SELECT DISTINCT ON (video_id) video_id, views as target_views, 
-                time as target_time
-                FROM video_stats 
-                ORDER BY video_id, time DESC
-            )
-            SELECT v.video_id, v.title, v.duration_seconds,
-                v.published_at, v.channel_id,
-                e.start_views, e.start_likes, e.start_comments, 
-                l.target_views,
-                EXTRACT(EPOCH FROM (l.target_time - e.start_time))/3600
-                    as hours_between
-            FROM videos v
-            JOIN earliest_stats e ON v.video_id = e.video_id
-            JOIN latest_stats l ON v.video_id = l.video_id
-            WHERE l.target_time > e.start_time + INTERVAL '1 hour'
-        """
-        )
-        return pd.read_sql(query, self.engine)
+        return _downcast_counters(self._read_sql(_TRAINING_PAIRS_FLEXIBLE_SQL))
 
     def get_velocity_training_data(self, min_hours=2):
         """
@@ -174,60 +464,18 @@ class DataLoader:
         Args:
             min_hours: Minimum tracking window required (default 2 hours)
         """
-        query = text(
-            f"""
-            WITH discovered_videos AS (
-                SELECT DISTINCT video_id, MIN(discovered_at) as first_discovered
-                FROM search_discovery
-                GROUP BY video_id
-            ),
-            earliest_stats AS (
-                SELECT DISTINCT ON (video_id) 
-                    video_id, 
-                    views as start_views, 
-                    likes as start_likes, 
-                    comments as start_comments, 
-                    time as start_time
-                FROM video_stats 
-                ORDER BY video_id, time ASC
-            ),
-            latest_stats AS (
-                SELECT DISTINCT ON (video_id) 
-                    video_id, 
-                    views as target_views,
-                    likes as end_likes,
-                    comments as end_comments,
-                    time as end_time
-                FROM video_stats 
-                ORDER BY video_id, time DESC
-            )
-            SELECT 
-                v.video_id,
-                v.title,
-                v.tags,
-                v.duration_seconds,
-                v.published_at,
-                v.channel_id,
-                v.category_id,
-                d.first_discovered,
-                e.start_views,
-                e.start_likes,
-                e.start_comments,
-                e.start_time,
-                l.target_views,
-                l.end_likes,
-                l.end_comments,
-                l.end_time,
-                EXTRACT(EPOCH FROM (l.end_time - e.start_time))/3600 as hours_tracked
-            FROM discovered_videos d
-            JOIN videos v ON d.video_id = v.video_id
-            JOIN earliest_stats e ON d.video_id = e.video_id
-            JOIN latest_stats l ON d.video_id = l.video_id
-            WHERE l.end_time > e.start_time + INTERVAL '{min_hours} hours'
-            ORDER BY d.first_discovered DESC
+        chunks = list(self.iter_velocity_training_data(min_hours=min_hours))
+        # Chunks may narrow differently; settle on one dtype per column
+        return _downcast_counters(_concat_chunks(chunks))
+
+    def iter_velocity_training_data(self, min_hours=2):
         """
-        )
-        return pd.read_sql(query, self.engine)
+        Streaming variant of get_velocity_training_data.
+        Yields chunks of at most READ_CHUNK_SIZE rows with counters narrowed.
+        """
+        params = {"min_hours": min_hours}
+        for chunk in self._iter_sql(_VELOCITY_TRAINING_SQL, params=params):
+            yield _downcast_counters(chunk)
 
     def get_deduplicated_stats(self):
         """Fetch latest stats and remove duplicates.
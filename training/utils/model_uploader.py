@@ -1,7 +1,16 @@
 import os
-from datetime import datetime
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
-from huggingface_hub import HfApi, hf_hub_download
+from huggingface_hub import (
+    CommitOperationAdd,
+    CommitOperationCopy,
+    HfApi,
+    hf_hub_download,
+)
+from huggingface_hub.hf_api import RepoFile
 from huggingface_hub.utils import EntryNotFoundError, RepositoryNotFoundError
 
 
@@ -36,16 +45,120 @@ class ModelUploader:
     def _archive_existing_file(self, path_in_repo):
         """
         Internal helper: Checks if a file exists on the Hub.
-        If yes, downloads it and re-uploads it to 'archive/{path}-{timestamp}'.
+        If yes, copies it to 'archive/{path}-{timestamp}' on the Hub.
         """
         print(f"Checking for existing file to archive: {path_in_repo}...")
 
+        filename = os.path.basename(path_in_repo)
+        archive_path_in_repo = self._archive_path(path_in_repo)
+
         try:
-            # Attempt to download the existing file from the Hub
-            # We use a temporary local directory to store the old file
-            temp_download_dir = "/tmp/viralvelocity_archive_buffer"
-            os.makedirs(temp_download_dir, exist_ok=True)
+            try:
+                # Server-side copy, so no bytes leave the Hub
+                self.api.create_commit(
+                    repo_id=self.repo_id,
+                    repo_type="model",
+                    operations=[
+                        CommitOperationCopy(
+                            src_path_in_repo=path_in_repo,
+                            path_in_repo=archive_path_in_repo,
+                        )
+                    ],
+                    token=self.token,
+                    commit_message=f"Archive previous version of {filename}",
+                )
+            except NotImplementedError:
+                # The Hub can only copy LFS files; small files are re-uploaded
+                self._reupload_to_archive(path_in_repo, archive_path_in_repo)
 
+            print(f"Existing file found. Archived to: {archive_path_in_repo}")
+
+        except (EntryNotFoundError, RepositoryNotFoundError):
+            # This is normal for the very first run
+            print("No existing file found (or repo new). Skipping archive step.")
+        except Exception as e:
+            print(f"Warning: Could not archive existing file. Error: {str(e)}")
+            print("Continuing with overwrite...")
+
+    @staticmethod
+    def _archive_path(path_in_repo):
+        """
+        Structure: archive/{folder}/{filename}-{YYYYMMDDTHHMMSS}-{uuid8}.{ext}
+        The UTC timestamp keeps archives sortable across workers; the suffix
+        keeps two archives within the same second from colliding.
+        """
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        directory, filename = os.path.split(path_in_repo)
+        name, ext = os.path.splitext(filename)
+
+        archive_filename = f"{name}-{timestamp}-{uuid.uuid4().hex[:8]}{ext}"
+        return os.path.join("archive", directory, archive_filename)
+
+    def _archive_operations(self, paths_in_repo):
+        """
+        Builds commit operations that archive the existing versions of
+        `paths_in_repo`, so they can ride along in the commit that replaces them.
+        """
+        try:
+            existing = self.api.get_paths_info(
+                repo_id=self.repo_id,
+                paths=list(paths_in_repo),
+                repo_type="model",
+                token=self.token,
+            )
+        except RepositoryNotFoundError:
+            # This is normal for the very first run
+            print("Repo not found. Skipping archive step.")
+            return []
+        except Exception as e:
+            print(f"Warning: Could not list existing files. Error: {str(e)}")
+            print("Continuing with overwrite...")
+            return []
+
+        operations = []
+        for info in existing:
+            if not isinstance(info, RepoFile):
+                continue
+            archive_path_in_repo = self._archive_path(info.path)
+            if info.lfs is not None:
+                # Server-side copy, so no bytes leave the Hub
+                operations.append(
+                    CommitOperationCopy(
+                        src_path_in_repo=info.path,
+                        path_in_repo=archive_path_in_repo,
+                    )
+                )
+            else:
+                # The Hub can only copy LFS files; small files are re-added
+                try:
+                    operations.append(
+                        CommitOperationAdd(
+                            path_in_repo=archive_path_in_repo,
+                            path_or_fileobj=self._download_bytes(info.path),
+                        )
+                    )
+                except Exception as e:
+                    print(f"Warning: Could not archive {info.path}. Error: {str(e)}")
+                    continue
+            print(f"Archiving {info.path} to: {archive_path_in_repo}")
+        return operations
+
+    def _download_bytes(self, path_in_repo):
+        """Reads a (small) file from the Hub into memory."""
+        with tempfile.TemporaryDirectory() as temp_download_dir:
+            local_file = hf_hub_download(
+                repo_id=self.repo_id,
+                filename=path_in_repo,
+                token=self.token,
+                local_dir=temp_download_dir,
+                local_dir_use_symlinks=False,
+            )
+            with open(local_file, "rb") as f:
+                return f.read()
+
+    def _reupload_to_archive(self, path_in_repo, archive_path_in_repo):
+        """Downloads a file from the Hub and uploads it to its archive path."""
+        with tempfile.TemporaryDirectory() as temp_download_dir:
             local_old_file = hf_hub_download(
                 repo_id=self.repo_id,
                 filename=path_in_repo,
@@ -55,40 +168,17 @@ class ModelUploader:
                 local_dir_use_symlinks=False,
             )
 
-            # Construct the archive path
-            # Structure: archive/{original_folder}/{filename}-{YYYYMMDD-HHMMSS}.{ext}
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            directory, filename = os.path.split(path_in_repo)
-            name, ext = os.path.splitext(filename)
-
-            archive_filename = f"{name}-{timestamp}{ext}"
-            archive_path_in_repo = os.path.join("archive", directory, archive_filename)
-
-            print(f"Existing file found. Archiving to: {archive_path_in_repo}")
-
-            # Re-upload to the archive location
             self.api.upload_file(
                 path_or_fileobj=local_old_file,
                 path_in_repo=archive_path_in_repo,
                 repo_id=self.repo_id,
                 repo_type="model",
                 token=self.token,
-                commit_message=f"Archive previous version of {filename}",
+                commit_message=(
+                    f"Archive previous version of {os.path.basename(path_in_repo)}"
+                ),
             )
 
-            # Clean up the temp file to save space
-            try:
-                os.remove(local_old_file)
-            except OSError:
-                pass
-
-        except (EntryNotFoundError, RepositoryNotFoundError):
-            # This is normal for the very first run
-            print("No existing file found (or repo new). Skipping archive step.")
-        except Exception as e:
-            print(f"Warning: Could not archive existing file. Error: {str(e)}")
-            print("Continuing with overwrite...")
-
     def upload_file(self, local_path, path_in_repo):
         """
         Uploads a file to HF Hub.
@@ -118,6 +208,39 @@ class ModelUploader:
 
         print("Upload complete.")
 
+    def bulk_upload(self, files, commit_message="Update artifacts"):
+        """
+        Uploads several files to HF Hub in a single commit.
+        The previous version of each file, if any, is archived in that commit.
+
+        Args:
+            files (dict): Mapping of path-in-repo -> local path or bytes.
+            commit_message (str): Message for the combined commit.
+        """
+        for content in files.values():
+            if not isinstance(content, bytes) and not os.path.exists(content):
+                raise FileNotFoundError(f"Local file not found: {content}")
+
+        # Copies are resolved against the parent revision, so archiving and
+        # overwriting the same paths in one commit is safe
+        operations = self._archive_operations(files)
+        operations.extend(
+            CommitOperationAdd(path_in_repo=path_in_repo, path_or_fileobj=content)
+            for path_in_repo, content in files.items()
+        )
+
+        print(f"Uploading {len(files)} files to {self.repo_id}...")
+
+        self.api.create_commit(
+            repo_id=self.repo_id,
+            operations=operations,
+            commit_message=commit_message,
+            repo_type="model",
+            token=self.token,
+        )
+
+        print("Upload complete.")
+
     def upload_reports(self, reports, folder="reports"):
         """Upload multiple report files to the Hub.
 
@@ -125,15 +248,28 @@ class ModelUploader:
             reports (dict): Mapping of report-name -> local path.
             folder (str): Repo folder to upload reports into.
         """
+        uploads = []
         for name, local_path in reports.items():
-            if not os.path.exists(local_path):
-                print(f"Warning: Report {local_path} not found. Skipping.")
-                continue
-
             # Construct path in repo
             # Standardize naming: {name}_latest.html
             filename = f"{name}_latest.html"
             path_in_repo = f"{folder}/{filename}"
 
+            if not os.path.exists(local_path):
+                print(f"Warning: Report {local_path} not found. Skipping.")
+                continue
+
             # Use the standard upload logic (which handles archiving)
-            self.upload_file(local_path, path_in_repo)
+            uploads.append((local_path, path_in_repo))
+
+        if not uploads:
+            return
+
+        # Reports are independent, network-bound uploads
+        with ThreadPoolExecutor(max_workers=min(8, len(uploads))) as pool:
+            futures = [
+                pool.submit(self.upload_file, local_path, path)
+                for local_path, path in uploads
+            ]
+            for future in futures:
+                future.result()
@@ -1,7 +1,115 @@
+import atexit
+import logging
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Discord accepts at most 10 embeds per webhook message
+MAX_EMBEDS = 10
+
+logger = logging.getLogger(__name__)
+
+# Read once: alerting is either configured for the whole process or disabled
+_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
+_warned_missing_webhook = False
+
+
+def _make_session() -> requests.Session:
+    """One keep-alive session for all alerts; retries honour Retry-After."""
+    session = requests.Session()
+    session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=4,
+            max_retries=Retry(
+                total=3,
+                # A read error or timeout usually means Discord already took
+                # the message; only connection failures are retried
+                read=0,
+                backoff_factor=0.5,
+                # Only rate limits and unavailability, where Retry-After
+                # applies; retrying other 5xx could post an alert twice
+                status_forcelist=(429, 503),
+                allowed_methods=frozenset({"POST"}),
+            ),
+        ),
+    )
+    return session
+
+
+_SESSION = _make_session() if _WEBHOOK_URL else None
+
+# Alerts are posted by a daemon thread so callers never wait on Discord
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _enqueue(embed: dict):
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(
+                target=_drain_queue, name="discord-alerts", daemon=True
+            )
+            _worker.start()
+    _queue.put(embed)
+
+
+def _drain_queue():
+    while True:
+        batch = [_queue.get()]
+        # Coalesce whatever else is already waiting into one message
+        while len(batch) < MAX_EMBEDS:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        _post_embeds(batch)
+        for _ in batch:
+            _queue.task_done()
+
+
+def flush_alerts(timeout: float = 10.0) -> bool:
+    """
+    Waits for queued alerts to be posted.
+
+    Returns:
+        True if the queue drained within `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    with _queue.all_tasks_done:
+        while _queue.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _queue.all_tasks_done.wait(remaining)
+    return True
+
+
+# Deliver the last alerts (e.g. a flow's final status) before the process exits
+atexit.register(flush_alerts)
+
+
+def _post_embeds(embeds: list):
+    if _SESSION is None:
+        return
+
+    payload = {"username": "ML Orchestrator", "embeds": embeds}
+
+    try:
+        response = _SESSION.post(_WEBHOOK_URL, json=payload, timeout=5)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"Failed to send notification: {e}")
 
 
 def send_discord_alert(
@@ -10,10 +118,13 @@ def send_discord_alert(
     """
     Sends a formatted alert to a Discord Webhook.
     Set DISCORD_WEBHOOK_URL in your .env file.
+    The alert is posted in the background, batched with any others queued.
     """
-    webhook_url = os.getenv("DISCORD_WEBHOOK_URL")
-    if not webhook_url:
-        print("DISCORD_WEBHOOK_URL not set. Skipping notification.")
+    global _warned_missing_webhook
+    if _SESSION is None:
+        if not _warned_missing_webhook:
+            logger.warning("DISCORD_WEBHOOK_URL not set. Skipping notifications.")
+            _warned_missing_webhook = True
         return
 
     color = 5763719 if status == "SUCCESS" else 15548997  # Green vs Red
@@ -30,10 +141,4 @@ def send_discord_alert(
         for key, value in details.items():
             embed["fields"].append({"name": key, "value": str(value), "inline": True})
 
-    payload = {"username": "ML Orchestrator", "embeds": [embed]}
-
-    try:
-        response = requests.post(webhook_url, json=payload)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"Failed to send notification: {e}")
+    _enqueue(embed)